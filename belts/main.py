@@ -5,112 +5,398 @@
 
 import sys
 import json
-from collections import deque, defaultdict
+from array import array
+from collections import deque
+
+try:
+    import orjson  # optional: C parser/serializer
+except ImportError:
+    orjson = None
 
 EPS = 1e-9
 INF = 10**18
+# Integer inputs up to this magnitude run on DinicInt; sums of many such
+# capacities still fit the int64 residual array.
+MAX_INT_CAP = 2**48
+# Feasibility flows where at least this share of nodes carries an
+# imbalance edge to s*/t*, on a graph with at most PUSH_RELABEL_MAX_DEGREE
+# edges per node, run on push-relabel instead of Dinic (measured ~20-35%
+# faster there; Dinic wins on deeper or denser graphs).
+PUSH_RELABEL_MIN_TERMINAL_SHARE = 0.8
+PUSH_RELABEL_MAX_DEGREE = 2.5
+# DinicInt uses capacity scaling once the shortest s-t path is this long
+SCALING_MIN_DEPTH = 64
 
 class Dinic:
+    # Edges live in flat parallel arrays: edge e goes to `to[e]` with residual
+    # `cap[e]`, and its reverse is always e ^ 1 (so the tail of e is
+    # to[e ^ 1]). `to`/`cap` are typed arrays (unboxed C ints/doubles, 4B and
+    # 8B per edge) and map one-to-one onto a compiled (C/Cython) kernel layout.
+    # add_edge only appends; `adj[u]` (the edge ids leaving u) is built for
+    # all nodes in one pass before the first search.
+    cap_type = "d"  # array typecode for residual capacities
+    eps = EPS       # residuals at or below this count as saturated
+    zero = 0.0
+
     def __init__(self, n):
         self.n = n
-        self.adj = [[] for _ in range(n)]
+        self.adj = None
+        self.to = array("i")
+        self.cap = array(self.cap_type)
+        # BFS buffers reused across phases: each node is queued at most once,
+        # so `queue` needs exactly n slots; `visited_count` remembers how many
+        # entries of `level` the last BFS set, so only those are reset.
+        self.level = [-1] * n
+        self.queue = [0] * n
+        self.visited_count = 0
+        # levels from the BFS that ended the last max_flow; None after a
+        # push_relabel run
+        self.last_level = None
 
     def add_edge(self, u, v, cap):
-        # forward edge index
-        self.adj[u].append([v, cap, None])  # [to, cap, rev_idx placeholder]
-        self.adj[v].append([u, 0.0, None])
-        self.adj[u][-1][2] = len(self.adj[v]) - 1
-        self.adj[v][-1][2] = len(self.adj[u]) - 1
-        return (u, len(self.adj[u]) - 1)  # reference to forward edge
-
-    def bfs_level(self, s, t):
-        level = [-1] * self.n
-        q = deque()
+        e = len(self.to)
+        self.to.append(v)
+        self.cap.append(cap)
+        self.to.append(u)
+        self.cap.append(0)
+        self.adj = None  # adjacency must be rebuilt
+        return e  # reference to forward edge
+
+    def build_adjacency(self):
+        # Group edge ids by tail in insertion order. Plain per-node lists beat
+        # a start/order CSR pair here: CPython iterates a list directly, while
+        # CSR pays an extra index lookup (and int boxing) per edge visit.
+        to = self.to
+        adj = [[] for _ in range(self.n)]
+        for e in range(len(to)):
+            adj[to[e ^ 1]].append(e)
+        self.adj = adj
+
+    def bfs_level(self, s, t, lim):
+        # Level graph over edges with residual > lim.
+        # hot loop: bind everything it touches to locals once per call
+        adj = self.adj
+        to = self.to
+        cap = self.cap
+        level = self.level
+        queue = self.queue
+        for i in range(self.visited_count):
+            level[queue[i]] = -1
         level[s] = 0
-        q.append(s)
-        while q:
-            u = q.popleft()
-            for v, cap, rev in self.adj[u]:
-                if cap > EPS and level[v] < 0:
-                    level[v] = level[u] + 1
-                    q.append(v)
+        queue[0] = s
+        head, tail = 0, 1
+        while head < tail:
+            u = queue[head]
+            head += 1
+            next_level = level[u] + 1
+            for e in adj[u]:
+                v = to[e]
+                if cap[e] > lim and level[v] < 0:
+                    level[v] = next_level
+                    queue[tail] = v
+                    tail += 1
+        self.visited_count = tail
         return level
 
-    def dfs_flow(self, u, t, f, level, it):
-        if u == t:
-            return f
-        for i in range(it[u], len(self.adj[u])):
+    def blocking_flow(self, s, t, level, it, lim):
+        # Iterative DFS: `path` holds the edge ids taken from s, so long
+        # augmenting paths cost no Python frames and cannot hit the
+        # recursion limit. `stack` holds the matching tail nodes. After each
+        # augmentation the search resumes from the tail of the first edge it
+        # saturated rather than from s, so one call drains the whole phase.
+        adj = self.adj
+        to = self.to
+        cap = self.cap
+        path = []
+        stack = []
+        total = self.zero
+        u = s
+        while True:
+            if u == t:
+                pushed = INF
+                for e in path:
+                    c = cap[e]
+                    if c < pushed:
+                        pushed = c
+                for e in path:
+                    # subtract from forward, add to reverse
+                    cap[e] -= pushed
+                    cap[e ^ 1] += pushed
+                total += pushed
+                j = 0
+                while cap[path[j]] > lim:
+                    j += 1
+                u = stack[j]
+                del path[j:]
+                del stack[j:]
+                continue
+            edges = adj[u]
+            n_edges = len(edges)
+            next_level = level[u] + 1
+            i = it[u]
+            while i < n_edges:
+                e = edges[i]
+                if cap[e] > lim and level[to[e]] == next_level:
+                    break
+                i += 1
             it[u] = i
-            v, cap, rev = self.adj[u][i]
-            if cap > EPS and level[u] + 1 == level[v]:
-                pushed = self.dfs_flow(v, t, min(f, cap), level, it)
-                if pushed > EPS:
-                    # subtract from forward
-                    self.adj[u][i][1] -= pushed
-                    # add to reverse
-                    rev_idx = self.adj[u][i][2]
-                    # reverse is at adj[v][rev_idx]
-                    self.adj[v][rev_idx][1] += pushed
-                    return pushed
-        return 0.0
+            if i < n_edges:
+                # advance along the admissible edge
+                path.append(e)
+                stack.append(u)
+                u = to[e]
+            else:
+                # dead end: drop u from the level graph for the rest of this
+                # phase so no other parent re-walks its exhausted edges
+                level[u] = -1
+                if not path:
+                    return total
+                # retreat and skip the edge that led here
+                path.pop()
+                u = stack.pop()
+                it[u] += 1
 
     def max_flow(self, s, t):
-        flow = 0.0
-        while True:
-            level = self.bfs_level(s, t)
-            if level[t] < 0:
-                break
-            it = [0] * self.n
+        if self.adj is None:
+            self.build_adjacency()
+        flow = self.zero
+        # The depth probe for phase_limits is the exact (lim == eps) level
+        # graph, so an unscaled run uses it as its first phase instead of
+        # repeating the same BFS.
+        level = self.bfs_level(s, t, self.eps)
+        fresh = self.eps
+        for lim in self.phase_limits(level[t]):
             while True:
-                pushed = self.dfs_flow(s, t, INF, level, it)
-                if pushed <= EPS:
+                if lim != fresh:
+                    level = self.bfs_level(s, t, lim)
+                fresh = None
+                if level[t] < 0:
                     break
-                flow += pushed
+                flow += self.blocking_flow(s, t, level, [0] * self.n, lim)
+        # The last phase runs at lim == eps, so the failed BFS that ended it
+        # walked every residual edge from s: level[v] >= 0 is exactly "v is
+        # reachable from s" (the cut).
+        self.last_level = level
         return flow
 
-    # helper: get remaining cap of forward edge reference (u, idx)
+    def phase_limits(self, depth):
+        # residual thresholds, one Dinic run each; plain Dinic is one run
+        return (self.eps,)
+
+    def push_relabel(self, s, t):
+        # FIFO push-relabel with the gap heuristic on the same residual
+        # arrays, for graphs where s feeds many nodes directly. Blocking
+        # flows keep re-saturating shallow s-edges there, while push-relabel
+        # floods every s-edge once and only moves excess locally. Excess
+        # that cannot reach t is lifted above n and drains back to s, so the
+        # result is a valid flow (not just a preflow) and the residual graph
+        # can be used for reconstruction and cuts afterwards.
+        if self.adj is None:
+            self.build_adjacency()
+        self.last_level = None
+        n = self.n
+        adj = self.adj
+        to = self.to
+        cap = self.cap
+        eps = self.eps
+        # exact initial labels: residual distance to t (reverse BFS); nodes
+        # that cannot reach t start at n + 1 and will only drain back to s
+        height = [n + 1] * n
+        height[t] = 0
+        q = deque([t])
+        while q:
+            v = q.popleft()
+            for e in adj[v]:
+                u = to[e]
+                if height[u] == n + 1 and u != s and cap[e ^ 1] > eps:
+                    height[u] = height[v] + 1
+                    q.append(u)
+        height[s] = n
+        excess = [self.zero] * n
+        count = [0] * (2 * n + 1)  # nodes per height, for the gap check
+        for h in height:
+            count[h] += 1
+        current = [0] * n          # current-arc pointer into adj[u]
+        active = deque()
+        for e in adj[s]:
+            c = cap[e]
+            if c > eps:
+                v = to[e]
+                cap[e] -= c
+                cap[e ^ 1] += c
+                excess[s] -= c
+                if excess[v] <= eps and v != t:
+                    active.append(v)
+                excess[v] += c
+        while active:
+            u = active.popleft()
+            # discharge u
+            edges = adj[u]
+            while excess[u] > eps:
+                i = current[u]
+                if i == len(edges):
+                    # relabel: one above the lowest residual neighbour
+                    old = height[u]
+                    h = 2 * n
+                    for e in edges:
+                        if cap[e] > eps and height[to[e]] + 1 < h:
+                            h = height[to[e]] + 1
+                    count[old] -= 1
+                    height[u] = h
+                    count[h] += 1
+                    current[u] = 0
+                    if count[old] == 0 and old < n:
+                        # gap: nothing above `old` can reach t any more
+                        for w in range(n):
+                            if old < height[w] < n:
+                                count[height[w]] -= 1
+                                height[w] = n + 1
+                                count[n + 1] += 1
+                    continue
+                e = edges[i]
+                v = to[e]
+                if cap[e] > eps and height[u] == height[v] + 1:
+                    d = excess[u] if excess[u] < cap[e] else cap[e]
+                    cap[e] -= d
+                    cap[e ^ 1] += d
+                    excess[u] -= d
+                    if excess[v] <= eps and v != s and v != t:
+                        active.append(v)
+                    excess[v] += d
+                else:
+                    current[u] = i + 1
+        return excess[t]
+
+    # helper: get remaining cap of forward edge reference
     def get_edge_cap(self, ref):
-        u, idx = ref
-        return self.adj[u][idx][1]
+        return self.cap[ref]
+
+    # helper: nodes reachable from s through edges with residual capacity
+    def reachable(self, s):
+        if self.adj is None:
+            self.build_adjacency()
+        adj = self.adj
+        to = self.to
+        cap = self.cap
+        eps = self.eps
+        visited = [False] * self.n
+        q = deque([s])
+        visited[s] = True
+        while q:
+            u = q.popleft()
+            for e in adj[u]:
+                v = to[e]
+                if cap[e] > eps and not visited[v]:
+                    visited[v] = True
+                    q.append(v)
+        return visited
 
 
-def main():
-    data = json.load(sys.stdin)
+class DinicInt(Dinic):
+    # Exact variant for all-integer inputs: int64 residuals, `cap > 0` tests
+    # with no tolerance, and no float rounding to trigger false infeasibility.
+    cap_type = "q"
+    eps = 0
+    zero = 0
+
+    def phase_limits(self, depth):
+        # Capacity scaling: phase k only uses residuals >= 2**k, so big
+        # capacities are routed in a few fat augmentations before the small
+        # ones; O(log U) scaling phases, then a final exact phase. Each
+        # extra phase costs a BFS sweep or more, which only pays off when
+        # s-t paths are long (deep chains); shallow graphs run exact only.
+        if depth < SCALING_MIN_DEPTH:
+            return (0,)
+        return self._scaled_limits()
+
+    def _scaled_limits(self):
+        top = max(self.cap, default=0)
+        delta = 1 << (top.bit_length() - 1) if top > 0 else 1
+        while delta > 1:
+            yield delta - 1
+            delta >>= 1
+        yield 0
+
+
+def loads(raw):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def dumps(obj):
+    # compact JSON as bytes; orjson rejects integers beyond 64 bits, which
+    # the stdlib encodes, so those objects take the stdlib path
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            pass
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def read_input():
+    # one read() of the raw bytes, then a single parse
+    return loads(sys.stdin.buffer.read())
+
+
+def write_output(obj):
+    sys.stdout.buffer.write(dumps(obj))
+
+
+def serve():
+    # --serve: NDJSON loop, one request object per stdin line and one
+    # response line each, so a caller pays interpreter start-up once
+    out = sys.stdout.buffer
+    for line in sys.stdin.buffer:
+        if line.strip():
+            out.write(dumps(solve(loads(line))) + b"\n")
+            out.flush()
+
 
+def solve(data):
+    # Solve one parsed belts problem and return the output object.
     nodes_list = data.get("nodes", [])
     edges_in = data.get("edges", [])
     sources = data.get("sources", {})  # mapping name->supply
     sink_name = data.get("sink")
     node_caps = data.get("node_caps", {})
 
+    # All-integer inputs (the usual case) are solved with exact int
+    # capacities on DinicInt; anything else falls back to floats.
+    bounds = [e.get(k, 0) for e in edges_in for k in ("lo", "hi")]
+    integral = all(type(x) is int and abs(x) <= MAX_INT_CAP
+                   for vals in (bounds, sources.values(), node_caps.values())
+                   for x in vals)
+    num = int if integral else float
+
     # Total supply
-    total_supply = 0.0
+    total_supply = num(0)
     for sname, val in sources.items():
-        total_supply += float(val)
+        total_supply += num(val)
 
-    # Map each original node to indices in graph (in_idx, out_idx)
-    idx_counter = 0
+    # Map each original node to indices in graph (in_idx, out_idx).
+    # node_name[i] is the original name behind index i, so mapping graph
+    # indices back to nodes is a list lookup.
+    # For node-splitting, if split, add an edge in->out with capacity=node_caps[name]
+    # We'll need adjacency after we create Dinic, so record splitting edges to add.
     in_idx = {}
     out_idx = {}
+    node_name = []
+    splitting_edges = []
     for name in nodes_list:
+        i = len(node_name)
+        in_idx[name] = i
+        node_name.append(name)
         # do not split source or sink
         if (name in node_caps) and (name != sink_name) and (name not in sources):
-            in_idx[name] = idx_counter; idx_counter += 1
-            out_idx[name] = idx_counter; idx_counter += 1
+            out_idx[name] = i + 1
+            node_name.append(name)
+            splitting_edges.append((name, i, i + 1, num(node_caps[name])))
         else:
             # single node (no splitting)
-            in_idx[name] = idx_counter
-            out_idx[name] = idx_counter
-            idx_counter += 1
-
-    # We'll build graph with these node-indices, plus s_star and t_star later.
-    # For node-splitting, if split, add an edge in->out with capacity=node_caps[name]
-    # We'll need adjacency after we create Dinic, so record splitting edges to add.
-    splitting_edges = []
-    for name in nodes_list:
-        if in_idx[name] != out_idx[name]:
-            cap = float(node_caps.get(name, 0.0))
-            splitting_edges.append((name, in_idx[name], out_idx[name], cap))
+            out_idx[name] = i
+    idx_counter = len(node_name)
 
     # For each original edge, create transformed edge u_out -> v_in with cap = hi - lo
     # Record lower bounds per edge for reconstruction.
@@ -118,50 +404,87 @@ def main():
     # Also check for invalid hi < lo
     for e in edges_in:
         u = e["from"]; v = e["to"]
-        lo = float(e.get("lo", 0.0))
-        hi = float(e.get("hi", 0.0))
+        lo = num(e.get("lo", 0))
+        hi = num(e.get("hi", 0))
         if hi + EPS < lo:
             # infeasible bounds
             out = {"status": "infeasible", "reason": "edge hi < lo", "edge": e}
-            json.dump(out, sys.stdout)
-            return
+            return out
         u_out = out_idx[u]
         v_in = in_idx[v]
         transformed_edges.append((u_out, v_in, lo, hi))
 
+    if sink_name is None:
+        # no sink provided -> infeasible
+        out = {"status": "infeasible", "reason": "no sink provided"}
+        return out
+
     # Prepare sums of lower bounds per original node (but mapped to in/out indices)
-    sum_in_lo = defaultdict(float)   # keyed by node_in index
-    sum_out_lo = defaultdict(float)  # keyed by node_out index
+    sum_in_lo = [num(0)] * idx_counter   # indexed by node_in index
+    sum_out_lo = [num(0)] * idx_counter  # indexed by node_out index
+    has_out = [False] * idx_counter
     for (u_out, v_in, lo, hi) in transformed_edges:
         sum_out_lo[u_out] += lo
         sum_in_lo[v_in] += lo
+        has_out[u_out] = True
+
+    # Pre-flight checks, decided without building the flow graph. Both
+    # apply only where the source values are the only imbalances (no lower
+    # bounds), and read those values exactly: positive and negative
+    # supplies can cancel in total_supply while still forcing flow.
+    any_lo = any(lo for (_, _, lo, _) in transformed_edges)
+    nonzero = [name for name, val in sources.items() if num(val) != 0]
+    # A lone supplying source with no outgoing edge: the max-flow run would
+    # ship nothing and stop at {source}, so that cut (short by the whole
+    # supply) is its certificate. Any other imbalance could widen the cut,
+    # so every other input takes the full run.
+    if not any_lo and len(nonzero) == 1:
+        name = nonzero[0]
+        if (name != sink_name and name in in_idx and num(sources[name]) > EPS
+                and not has_out[in_idx[name]]):
+            deficit_val = num(sources[name])
+            if abs(round(deficit_val) - deficit_val) < 1e-6:
+                deficit_val = int(round(deficit_val))
+            out = {
+                "status": "infeasible",
+                "cut_reachable": [name],
+                "deficit": {
+                    "demand_balance": deficit_val,
+                    "tight_nodes": [],
+                    "tight_edges": []
+                }
+            }
+            return out
+    # Nothing to ship and nothing forced: the zero flow is the answer.
+    if not any_lo and not nonzero:
+        out = {
+            "status": "ok",
+            "max_flow_per_min": 0.0,
+            "flows": [{"from": e["from"], "to": e["to"], "flow": 0.0} for e in edges_in]
+        }
+        return out
 
     # Prepare s(v): supply per original node (attached to original node)
     # We'll use the original node mapping: s(v) positive for supply from sources,
     # sink has negative of total supply.
     s_map = {}
     for name in nodes_list:
-        s_map[name] = 0.0
+        s_map[name] = num(0)
     for name, val in sources.items():
-        s_map[name] = float(val)
-    if sink_name is None:
-        # no sink provided -> infeasible
-        out = {"status": "infeasible", "reason": "no sink provided"}
-        json.dump(out, sys.stdout)
-        return
-    s_map[sink_name] = s_map.get(sink_name, 0.0) - total_supply  # sink demand
+        s_map[name] = num(val)
+    s_map[sink_name] = s_map.get(sink_name, num(0)) - total_supply  # sink demand
 
     # Now build full node-level b(v) = s(v) + sum_in_lo - sum_out_lo
     # but we need sums at the transformed indices: use in_idx for sum_in, out_idx for sum_out
-    b_pos_sum = 0.0
+    b_pos_sum = num(0)
     b_vals_in_side = {}   # attach positive-side to node_in
     b_vals_out_side = {}  # attach negative-side to node_out
     for name in nodes_list:
-        s_val = float(s_map.get(name, 0.0))
+        s_val = s_map.get(name, num(0))
         node_in_i = in_idx[name]
         node_out_i = out_idx[name]
-        in_lo = sum_in_lo.get(node_in_i, 0.0)
-        out_lo = sum_out_lo.get(node_out_i, 0.0)
+        in_lo = sum_in_lo[node_in_i]
+        out_lo = sum_out_lo[node_out_i]
         b = s_val + in_lo - out_lo
         # If b > 0, we will need s* -> node_in cap b
         # If b < 0, we will need node_out -> t* cap -b
@@ -177,48 +500,55 @@ def main():
     S_star = idx_counter
     T_star = idx_counter + 1
     N = idx_counter + 2
-    dinic = Dinic(N)
+    dinic = DinicInt(N) if integral else Dinic(N)
 
     # Add splitting edges (node caps) and keep refs for diagnostics
     splitting_refs = []  # (name, in_idx, out_idx, ref, cap)
     for (name, u, v, cap) in splitting_edges:
-        ref = dinic.add_edge(u, v, float(cap))
-        splitting_refs.append((name, u, v, ref, float(cap)))
+        ref = dinic.add_edge(u, v, cap)
+        splitting_refs.append((name, u, v, ref, cap))
 
     # Add transformed edges with capacity hi-lo and remember references.
-    edge_refs = []  # for each original edge in same order, store (u_out, forward_ref, lo, orig_from, orig_to, cap)
+    edge_refs = []  # for each original edge in same order, store (u_out, forward_ref, lo, orig_from, orig_to)
     for idx, (u_out, v_in, lo, hi) in enumerate(transformed_edges):
-        capp = float(hi - lo)
         # add and store forward edge reference
-        ref = dinic.add_edge(u_out, v_in, capp)
-        edge_refs.append((u_out, ref, lo, edges_in[idx]["from"], edges_in[idx]["to"], capp))
+        ref = dinic.add_edge(u_out, v_in, hi - lo)
+        edge_refs.append((u_out, ref, lo, edges_in[idx]["from"], edges_in[idx]["to"]))
 
     # Add super-source and super-sink connections according to b_vals
     for node_in_i, b in b_vals_in_side.items():
-        dinic.add_edge(S_star, node_in_i, float(b))
+        dinic.add_edge(S_star, node_in_i, b)
     for node_out_i, b in b_vals_out_side.items():
-        dinic.add_edge(node_out_i, T_star, float(b))
+        dinic.add_edge(node_out_i, T_star, b)
 
     # Run maxflow from S_star to T_star to check lower-bound feasibility
-    maxflow_stars = dinic.max_flow(S_star, T_star)
+    n_terminal = len(b_vals_in_side) + len(b_vals_out_side)
+    n_inner = len(splitting_edges) + len(transformed_edges)
+    if (n_terminal >= PUSH_RELABEL_MIN_TERMINAL_SHARE * idx_counter
+            and n_inner <= PUSH_RELABEL_MAX_DEGREE * idx_counter):
+        initial_cap = dinic.cap[:]
+        maxflow_stars = dinic.push_relabel(S_star, T_star)
+        if maxflow_stars + 1e-6 < b_pos_sum:
+            # Infeasible: the cut is the same for every maximum flow, but
+            # tight_nodes reads which split edges this flow saturates, so
+            # the certificate comes from a Dinic run on the original
+            # capacities, as on every other instance.
+            dinic.cap[:] = initial_cap
+            maxflow_stars = dinic.max_flow(S_star, T_star)
+    else:
+        maxflow_stars = dinic.max_flow(S_star, T_star)
 
     # Compare to sum of positive b's
     if maxflow_stars + 1e-6 < b_pos_sum:
         # infeasible. compute reachable set from S_star in residual graph for certificate
-        visited = [False] * dinic.n
-        q = deque([S_star])
-        visited[S_star] = True
-        while q:
-            u = q.popleft()
-            for v, cap, rev in dinic.adj[u]:
-                if cap > EPS and not visited[v]:
-                    visited[v] = True
-                    q.append(v)
+        # after Dinic the reachable set is the final BFS level; push-relabel
+        # leaves no levels behind, so walk the residual graph then
+        if dinic.last_level is not None:
+            visited = [lv >= 0 for lv in dinic.last_level]
+        else:
+            visited = dinic.reachable(S_star)
         # Map visited indices back to original node names
-        reachable = set()
-        for name in nodes_list:
-            if visited[in_idx[name]] or visited[out_idx[name]]:
-                reachable.add(name)
+        reachable = {node_name[i] for i in range(idx_counter) if visited[i]}
 
         # Identify tight_nodes: split nodes within reachable whose splitting edge is saturated
         tight_nodes = []
@@ -229,15 +559,15 @@ def main():
 
         # Identify tight_edges: original edges that go from reachable to unreachable and are saturated
         tight_edges = []
-        for (u_out, ref, lo, orig_from, orig_to, cap) in edge_refs:
-            v_in = in_idx[orig_to]
+        for (u_out, ref, lo, orig_from, orig_to) in edge_refs:
+            v_in = dinic.to[ref]
             if visited[u_out] and not visited[v_in] and dinic.get_edge_cap(ref) <= EPS:
                 # flow_needed: the lower bound that must be pushed on this edge (lo)
                 # This is a conservative estimate consistent with typical lower-bound certificates
                 tight_edges.append({
                     "from": orig_from,
                     "to": orig_to,
-                    "flow_needed": lo
+                    "flow_needed": float(lo)
                 })
 
         deficit_val = b_pos_sum - maxflow_stars
@@ -256,33 +586,33 @@ def main():
                 "tight_edges": tight_edges
             }
         }
-        json.dump(out, sys.stdout)
-        return
+        return out
 
     # If feasible, reconstruct flows: flows on original edges = flow_used_on_ref + lo
-    # flow_used_on_ref = orig_cap (cap' = hi-lo) - remaining cap stored at forward edge
+    # flow_used_on_ref is the residual of the reverse edge (ref ^ 1), which
+    # starts at 0 and carries exactly what was pushed forward
     flows = []
     # compute flow into sink to report max_flow_per_min
     flow_into_sink = 0.0
-    # For quick lookup: identify which transformed edges target the sink node (original sink in_idx)
+    # Transformed edges into the sink are the ones whose head is the sink's
+    # in index (the sink is never split); an int compare per edge.
     sink_in_idx = in_idx[sink_name]
-    sink_out_idx = out_idx[sink_name]
+    # one pass over the edges, with the residual arrays bound to locals
+    cap = dinic.cap
+    to = dinic.to
+    append = flows.append
 
-    for (u_out, ref, lo, orig_from, orig_to, orig_cap) in edge_refs:
-        u_ref, idx_in_adj = ref
-        remaining_cap = dinic.get_edge_cap(ref)
-        used = orig_cap - remaining_cap
+    for (u_out, ref, lo, orig_from, orig_to) in edge_refs:
+        used = cap[ref ^ 1]
         if used < 0 and used > -EPS:
             used = 0.0
         final_flow = used + lo
         # clamp tiny negative to 0
         if final_flow < EPS:
             final_flow = 0.0
-        flows.append({"from": orig_from, "to": orig_to, "flow": final_flow})
+        append({"from": orig_from, "to": orig_to, "flow": float(final_flow)})
         # if this edge's v_in corresponds to sink's in index, count it as flow into sink
-        # Need to find the v_in index: we can recompute v_in from mapping edges_in list
-        # But we have orig_to; check if orig_to == sink_name
-        if orig_to == sink_name:
+        if to[ref] == sink_in_idx:
             flow_into_sink += final_flow
 
     # As a sanity: flow_into_sink should equal total_supply within EPS
@@ -290,10 +620,17 @@ def main():
     # Build output
     out = {
         "status": "ok",
-        "max_flow_per_min": flow_into_sink,
+        "max_flow_per_min": float(flow_into_sink),
         "flows": flows
     }
-    json.dump(out, sys.stdout)
+    return out
+
+
+def main():
+    if "--serve" in sys.argv[1:]:
+        serve()
+    else:
+        write_output(solve(read_input()))
 
 
 if __name__ == "__main__":
@@ -6,282 +6,320 @@ Uses OR-Tools pywraplp to solve the steady-state LP and minimize machine count.
 """
 import sys
 import json
-from math import isclose
-from ortools.linear_solver import pywraplp
+import math
+from ortools.linear_solver import linear_solver_pb2, pywraplp
 
-TOL = 1e-9
+try:
+    import orjson  # optional: C parser/serializer
+except ImportError:
+    orjson = None
+
+INF = float("inf")
+
+def loads(raw):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+def dumps(obj):
+    # compact JSON as bytes; orjson rejects integers beyond 64 bits, which
+    # the stdlib encodes, so those objects take the stdlib path
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            pass
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
 
 def read_input():
-    return json.load(sys.stdin)
+    # one read() of the raw bytes, then a single parse
+    return loads(sys.stdin.buffer.read())
 
 def write_output(obj):
-    json.dump(obj, sys.stdout, separators=(",", ":"))
+    sys.stdout.buffer.write(dumps(obj))
 
-def build_and_solve(data, maximize_target=False):
+def serve(warm=False):
+    # --serve: NDJSON loop, one request object per stdin line and one
+    # response line each, so a caller pays interpreter start-up once.
+    # --warm additionally reuses the model across rate-only changes
+    # (see WarmSolver).
+    solve_one = WarmSolver().solve if warm else solve
+    out = sys.stdout.buffer
+    for line in sys.stdin.buffer:
+        if line.strip():
+            out.write(dumps(solve_one(loads(line))) + b"\n")
+            out.flush()
+
+# Sparse item-balance rows, item -> (recipe columns, coefficients), built in
+# one pass that touches each recipe/item nonzero once. Column j is the j-th
+# recipe in dict order, with the net out * (1 + prod) - in for that item;
+# an item whose net is zero for every recipe keeps an empty row.
+def balance_rows(recipes, prod):
+    rows = {}
+    for j, (rname, r) in enumerate(recipes.items()):
+        # Output scaled by productivity of that recipe's machine
+        mult = 1.0 + prod[rname]
+        net = {}
+        for it, q in r.get("out", {}).items():
+            net[it] = q * mult
+        for it, q in r.get("in", {}).items():
+            net[it] = net.get(it, 0.0) - q
+        for it, coeff in net.items():
+            cols, vals = rows.setdefault(it, ([], []))
+            if coeff != 0:
+                cols.append(j)
+                vals.append(coeff)
+    return rows
+
+def model_key(data):
+    # the serialized input minus target.rate_per_min; WarmSolver reuses a
+    # model only while this stays the same (key order included)
+    target = data.get("target", {})
+    rest = {k: v for k, v in data.items() if k != "target"}
+    return dumps([rest, {k: v for k, v in target.items() if k != "rate_per_min"}])
+
+def build_model(data):
     machines = data.get("machines", {})
     recipes = data.get("recipes", {})
     modules = data.get("modules", {})
     limits = data.get("limits", {})
-    raw_caps = limits.get("raw_supply_per_min", {})
-    max_machines = limits.get("max_machines", {})
+    # limits cast to float once, for both the model rows and the tight checks
+    raw_caps = {it: float(v) for it, v in limits.get("raw_supply_per_min", {}).items()}
+    max_machines = {m: float(v) for m, v in limits.get("max_machines", {}).items()}
     target = data.get("target", {})
     target_item = target.get("item")
-    requested_rate = float(target.get("rate_per_min", 0.0))
 
-    # Precompute recipe -> machine, eff crafts/min and productivity multiplier
+    # Precompute recipe -> machine, eff crafts/min and productivity multiplier.
+    # Both depend only on the machine, so each machine's pair is computed
+    # once and shared by its recipes; the same pass groups recipes by
+    # machine for the machine rows and usage sums.
     eff = {}
     prod = {}
+    recipes_by_machine = {}
+    machine_params = {}
     for rname, r in recipes.items():
         mname = r["machine"]
-        machine_def = machines.get(mname, {})
-        base_cpm = float(machine_def.get("crafts_per_min"))
-        mod = modules.get(mname, {})
-        speed = float(mod.get("speed", 0.0))
-        prod_m = float(mod.get("prod", 0.0))
-        time_s = float(r["time_s"])
-        eff_r = base_cpm * (1.0 + speed)
-        eff[rname] = eff_r
-        prod[rname] = prod_m
+        params = machine_params.get(mname)
+        if params is None:
+            machine_def = machines.get(mname, {})
+            base_cpm = float(machine_def.get("crafts_per_min"))
+            mod = modules.get(mname, {})
+            speed = float(mod.get("speed", 0.0))
+            prod_m = float(mod.get("prod", 0.0))
+            params = machine_params[mname] = (base_cpm * (1.0 + speed), prod_m)
+        eff[rname], prod[rname] = params
+        recipes_by_machine.setdefault(mname, []).append(rname)
 
-    solver = pywraplp.Solver.CreateSolver("GLOP")  # continuous LP
-    if solver is None:
-        # fallback to CBC if GLOP not available
-        solver = pywraplp.Solver.CreateSolver("CBC")
+    # Per-recipe machine cost 1/eff_r, cached once; a recipe with eff_r <= 0
+    # can never run
+    runnable = {rname: e > 0 for rname, e in eff.items()}
+    inv_eff = {rname: (1.0 / e if e > 0 else 0.0) for rname, e in eff.items()}
+
+    # The model is assembled as an MPModelProto in plain Python, each row
+    # filled with two bulk extend() calls, and loaded into the solver in a
+    # single call instead of one SetCoefficient per nonzero through SWIG.
+    model = linear_solver_pb2.MPModelProto()
+
+    def add_var(lb, ub, name):
+        var = model.variable.add()
+        var.lower_bound = lb
+        var.upper_bound = ub
+        var.name = name
+        return len(model.variable) - 1
 
-    # Variables: x_r >= 0 (crafts/min)
-    x = {}
+    # Variables: x_r >= 0 (crafts/min), with the machine-count objective
+    # sum_r x_r / eff_r; an un-runnable recipe (eff_r <= 0) is fixed at 0
+    x_idx = {}
     for rname in recipes:
-        x[rname] = solver.NumVar(0.0, solver.infinity(), f"x[{rname}]")
+        if runnable[rname]:
+            x_idx[rname] = add_var(0.0, INF, f"x[{rname}]")
+            model.variable[x_idx[rname]].objective_coefficient = inv_eff[rname]
+        else:
+            x_idx[rname] = add_var(0.0, 0.0, f"x[{rname}]")
+
+    # Target rate variable, present in both phases: the target item's
+    # balance row carries -target_var. Phase 1 pins it to the requested
+    # rate and minimizes machines; if that is infeasible, phase 2 frees it
+    # and maximizes it on the same model, so nothing is rebuilt. Its
+    # bounds are set per solve.
+    target_idx = add_var(0.0, 0.0, "target_var")
 
     # For raw items, we introduce consumption variable c_i >= 0 and <= cap
-    items = set()
-    # print()
-    for r in recipes.values():
-        items.update(r.get("in", {}).keys())
-        items.update(r.get("out", {}).keys())
-    items = sorted(items)
-
-    # Build item constraints: sum_out * (1+prod_r_of_machine) * x_r - sum_in * x_r + consumption_raw = b[i]
-    # For intermediates: RHS = 0
-    # For target: RHS = target_rate (or variable if maximizing target)
-    # For raw items: RHS = 0 and consumption_raw variable is present constrained 0..cap (and moves to LHS)
-    consumption = {}
-    item_constraints = {}
-    for it in items:
-        # Left side expression coefficients prepared via constraints
-        # We'll create a constraint equal to RHS later.
-        # But OR-Tools requires building constraints directly.
-        pass
+    item_rows = balance_rows(recipes, prod)
+    items = sorted(item_rows)
 
-    # Create consumption variables and constraints per item
+    # Build item constraints: item row + consumption_raw - target_var = 0
+    # For intermediates: no target_var term
+    # For target: -target_var on the LHS
+    # For raw items: consumption_raw variable is present constrained 0..cap
+    consumption_idx = {}
     for it in items:
-        # Build linear expression coefficients for x variables
-        coeffs = []
-        for rname, r in recipes.items():
-            out = r.get("out", {})
-            inn = r.get("in", {})
-            out_qty = float(out.get(it, 0))
-            in_qty = float(inn.get(it, 0))
-            # Output scaled by productivity of that recipe's machine
-            mult = 1.0 + prod[rname]
-            # contribution = out_qty * mult * x_r - in_qty * x_r
-            coeff = out_qty * mult - in_qty
-            if abs(coeff) > 0:
-                coeffs.append((x[rname], coeff))
-
-        # RHS determination
-        is_target = (it == target_item)
-        is_raw = (it in raw_caps)
-
-        if is_raw:
+        # x variables were added first, in recipe order, so a recipe's
+        # column is its variable index
+        cols, vals = item_rows[it]
+        var_index = list(cols)
+        coefficient = list(vals)
+
+        if it in raw_caps:
             # create consumption var
-            cap = float(raw_caps[it])
-            c = solver.NumVar(0.0, cap, f"consumption[{it}]")
-            consumption[it] = c
-            # constraint: sum_coeffs + c = (target? unlikely for raw)  => RHS 0 normally
-            if is_target:
-                rhs = float(requested_rate) if not maximize_target else solver.NumVar(0.0, solver.infinity(), "target_var")
-            else:
-                rhs = 0.0
-            cons = solver.Constraint(rhs, rhs)
-            # add coefficients
-            for var, coeff in coeffs:
-                cons.SetCoefficient(var, coeff)
-            cons.SetCoefficient(c, 1.0)  # + c
-            item_constraints[it] = cons
-        else:
-            # intermediate or target (non-raw)
-            if is_target:
-                if maximize_target:
-                    # create a variable for target rate to maximize
-                    target_var = solver.NumVar(0.0, solver.infinity(), "target_var")
-                    rhs_var = target_var
-                else:
-                    rhs_var = float(requested_rate)
-            else:
-                rhs_var = 0.0
-            # create equality constraint
-            if isinstance(rhs_var, float):
-                cons = solver.Constraint(rhs_var, rhs_var)
-            else:
-                cons = solver.Constraint(0.0, 0.0)  # we'll handle by moving var to LHS
-            # set coefficients
-            for var, coeff in coeffs:
-                cons.SetCoefficient(var, coeff)
-            if not isinstance(rhs_var, float):
-                # move target_var to LHS as -1 * target_var
-                cons.SetCoefficient(rhs_var, -1.0)
-            item_constraints[it] = cons
+            consumption_idx[it] = add_var(0.0, raw_caps[it], f"consumption[{it}]")
+            var_index.append(consumption_idx[it])
+            coefficient.append(1.0)  # + c
+        if it == target_item:
+            var_index.append(target_idx)
+            coefficient.append(-1.0)
+        cons = model.constraint.add()
+        cons.lower_bound = 0.0
+        cons.upper_bound = 0.0
+        cons.var_index.extend(var_index)
+        cons.coefficient.extend(coefficient)
 
     # Machine usage constraints
-    machine_usage_cons = {}
     for mname in machines:
-        cons = solver.Constraint(0.0, float(max_machines.get(mname, float("inf"))))
         # sum_r x_r / eff_r <= max_machines[m]
-        for rname, r in recipes.items():
-            if r["machine"] == mname:
-                if eff[rname] <= 0:
-                    # un-runnable recipe -> force x_r == 0
-                    solver.Add(x[rname] == 0.0)
-                else:
-                    cons.SetCoefficient(x[rname], 1.0 / eff[rname])
-        machine_usage_cons[mname] = cons
-
-    # Objective: minimize total machines (sum_r x_r / eff_r)
+        cons = model.constraint.add()
+        cons.lower_bound = 0.0
+        cons.upper_bound = max_machines.get(mname, INF)
+        used = [rname for rname in recipes_by_machine.get(mname, ())
+                if runnable[rname]]
+        cons.var_index.extend([x_idx[rname] for rname in used])
+        cons.coefficient.extend([inv_eff[rname] for rname in used])
+
+    solver = pywraplp.Solver.CreateSolver("GLOP")  # continuous LP
+    if solver is None:
+        # fallback to CBC if GLOP not available
+        solver = pywraplp.Solver.CreateSolver("CBC")
+    # LoadModelFromProto reports a malformed model through its return
+    # value (an error string, "" on success) rather than raising
+    error = solver.LoadModelFromProto(model)
+    if error:
+        raise RuntimeError(f"could not load factory model: {error}")
+    variables = solver.variables()
+    x = {rname: variables[i] for rname, i in x_idx.items()}
+    target_var = variables[target_idx]
+    consumption = {it: variables[i] for it, i in consumption_idx.items()}
+
+    # Machines in use per type at a solution: sum_r x_r / eff_r over the
+    # machine's runnable recipes, shared by both phases' reports
+    def machine_usage(per_recipe):
+        usage = {}
+        for mname in machines:
+            total = 0.0
+            for rname in recipes_by_machine.get(mname, ()):
+                if runnable[rname]:
+                    total += per_recipe[rname] / eff[rname]
+            usage[mname] = total
+        return usage
+
+    return {"recipes": recipes, "machines": machines, "raw_caps": raw_caps,
+            "max_machines": max_machines, "inv_eff": inv_eff, "solver": solver,
+            "x": x, "target_var": target_var, "consumption": consumption,
+            "machine_usage": machine_usage, "min_objective": True}
+
+def solve_model(m, data, maximize_target=False):
+    # Both phases on a model from build_model, at data's target rate
+    recipes, machines = m["recipes"], m["machines"]
+    raw_caps, max_machines = m["raw_caps"], m["max_machines"]
+    solver, x, target_var = m["solver"], m["x"], m["target_var"]
+    consumption, machine_usage = m["consumption"], m["machine_usage"]
+
+    requested_rate = float(data.get("target", {}).get("rate_per_min", 0.0))
+    target_var.SetBounds(requested_rate, requested_rate)
+
+    # Objective: minimize total machines (sum_r x_r / eff_r), loaded with
+    # the model; restored here if a previous phase 2 replaced it
     objective = solver.Objective()
-    for rname in recipes:
-        if eff[rname] > 0:
-            objective.SetCoefficient(x[rname], 1.0 / eff[rname])
-    if maximize_target:
-        # If maximizing target, objective will be set later
-        pass
-    else:
+    if not m["min_objective"]:
+        objective.Clear()
+        for rname, coeff in m["inv_eff"].items():
+            objective.SetCoefficient(x[rname], coeff)
         objective.SetMinimization()
+        m["min_objective"] = True
+    if not maximize_target:
+        # Solve feasibility/minimization
+        status = solver.Solve()
+        if status == pywraplp.Solver.OPTIMAL or status == pywraplp.Solver.FEASIBLE:
+            # collect outputs
+            per_recipe = {r: x[r].solution_value() for r in recipes}
+            per_machine_counts = {mname: math.ceil(usage)
+                                  for mname, usage in machine_usage(per_recipe).items()}
+            raw_consumption = {}
+            for it, cvar in consumption.items():
+                raw_consumption[it] = cvar.solution_value()
+            return {"status": "ok",
+                    "per_recipe_crafts_per_min": per_recipe,
+                    "per_machine_counts": per_machine_counts,
+                    "raw_consumption_per_min": raw_consumption}
 
-    # If infeasible detection mode: we will allow target_var and maximize it
-    if maximize_target:
-        # Rebuild solver in maximize mode: we already created target_var earlier if needed
-        # Simpler approach: create a new solver formulation specifically for maximizing target
-        pass
-
-    # Solve feasibility/minimization
-    status = solver.Solve()
-    if status == pywraplp.Solver.OPTIMAL or status == pywraplp.Solver.FEASIBLE:
-        # collect outputs
-        per_recipe = {r: float(x[r].solution_value()) for r in recipes}
-        per_machine_counts = {}
-        for mname in machines:
-            usage = 0.0
-            for rname, r in recipes.items():
-                if r["machine"] == mname:
-                    if eff[rname] > 0:
-                        usage += per_recipe[rname] / eff[rname]
-            import math
-            per_machine_counts[mname] = math.ceil(usage)
+    # infeasible: compute maximal feasible target rate on the same model
+    # by freeing target_var and maximizing it instead
+    target_var.SetBounds(0.0, solver.infinity())
+    m["min_objective"] = False
+    objective.Clear()
+    objective.SetCoefficient(target_var, 1.0)
+    objective.SetMaximization()
+
+    stat2 = solver.Solve()
+    if stat2 == pywraplp.Solver.OPTIMAL or stat2 == pywraplp.Solver.FEASIBLE:
+        max_target = target_var.solution_value()
+        # collect bottleneck hints: which machines/raws are at cap
+        per_recipe = {r: x[r].solution_value() for r in recipes}
+        per_machine_counts = machine_usage(per_recipe)
+        tight = []
+        for mname, usage in per_machine_counts.items():
+            if mname in max_machines:
+                if usage >= max_machines[mname] - 1e-6:
+                    tight.append(mname + " cap")
+        raw_tight = []
         raw_consumption = {}
         for it, cvar in consumption.items():
-            raw_consumption[it] = float(cvar.solution_value())
-        return {"status": "ok",
-                "per_recipe_crafts_per_min": per_recipe,
-                "per_machine_counts": per_machine_counts,
-                "raw_consumption_per_min": raw_consumption}
+            val = cvar.solution_value()
+            raw_consumption[it] = val
+            if it in raw_caps and val >= raw_caps[it] - 1e-6:
+                raw_tight.append(it + " supply")
+        bottlenecks = tight + raw_tight
+        return {"status": "infeasible",
+                "max_feasible_target_per_min": max_target,
+                "bottleneck_hint": bottlenecks}
     else:
-        # infeasible: compute maximal feasible target rate via a separate LP
-        # Build a maximizing solver: maximize target_rate (a variable), subject to same constraints
-        solver2 = pywraplp.Solver.CreateSolver("GLOP")
-        if solver2 is None:
-            solver2 = pywraplp.Solver.CreateSolver("CBC")
-        # Recreate variables in solver2
-        x2 = {}
-        for rname in recipes:
-            x2[rname] = solver2.NumVar(0.0, solver2.infinity(), f"x[{rname}]")
-        # consumption2
-        consumption2 = {}
-        item_cons2 = {}
-        target_var = solver2.NumVar(0.0, solver2.infinity(), "target_var")
-        for it in items:
-            coeffs = []
-            for rname, r in recipes.items():
-                out_qty = float(r.get("out", {}).get(it, 0))
-                in_qty = float(r.get("in", {}).get(it, 0))
-                coeff = out_qty * (1.0 + prod[rname]) - in_qty
-                if abs(coeff) > 0:
-                    coeffs.append((x2[rname], coeff))
-            is_target = (it == target_item)
-            is_raw = (it in raw_caps)
-            if is_raw:
-                cap = float(raw_caps[it])
-                c = solver2.NumVar(0.0, cap, f"consumption[{it}]")
-                consumption2[it] = c
-                rhs = 0.0
-                cons = solver2.Constraint(rhs, rhs)
-                for var, coeff in coeffs:
-                    cons.SetCoefficient(var, coeff)
-                cons.SetCoefficient(c, 1.0)
-                item_cons2[it] = cons
-            else:
-                if is_target:
-                    cons = solver2.Constraint(0.0, 0.0)
-                    for var, coeff in coeffs:
-                        cons.SetCoefficient(var, coeff)
-                    cons.SetCoefficient(target_var, -1.0)
-                else:
-                    cons = solver2.Constraint(0.0, 0.0)
-                    for var, coeff in coeffs:
-                        cons.SetCoefficient(var, coeff)
-                item_cons2[it] = cons
-        # machine constraints
-        for mname in machines:
-            cons = solver2.Constraint(0.0, float(max_machines.get(mname, float("inf"))))
-            for rname, r in recipes.items():
-                if r["machine"] == mname:
-                    if eff[rname] <= 0:
-                        solver2.Add(x2[rname] == 0.0)
-                    else:
-                        cons.SetCoefficient(x2[rname], 1.0 / eff[rname])
-        # objective: maximize target_var
-        obj = solver2.Objective()
-        obj.SetCoefficient(target_var, 1.0)
-        obj.SetMaximization()
-
-        stat2 = solver2.Solve()
-        if stat2 == pywraplp.Solver.OPTIMAL or stat2 == pywraplp.Solver.FEASIBLE:
-            max_target = float(target_var.solution_value())
-            # collect bottleneck hints: which machines/raws are at cap
-            per_recipe = {r: float(x2[r].solution_value()) for r in recipes}
-            per_machine_counts = {}
-            tight = []
-            for mname in machines:
-                usage = 0.0
-                for rname, r in recipes.items():
-                    if r["machine"] == mname:
-                        if eff[rname] > 0:
-                            usage += per_recipe[rname] / eff[rname]
-                per_machine_counts[mname] = usage
-                if mname in max_machines:
-                    if usage >= float(max_machines[mname]) - 1e-6:
-                        tight.append(mname + " cap")
-            raw_tight = []
-            raw_consumption = {}
-            for it, cvar in consumption2.items():
-                val = float(cvar.solution_value())
-                raw_consumption[it] = val
-                if it in raw_caps and val >= float(raw_caps[it]) - 1e-6:
-                    raw_tight.append(it + " supply")
-            bottlenecks = tight + raw_tight
-            return {"status": "infeasible",
-                    "max_feasible_target_per_min": max_target,
-                    "bottleneck_hint": bottlenecks}
-        else:
-            # totally impossible or numerical failure
-            return {"status": "infeasible",
-                    "max_feasible_target_per_min": 0.0,
-                    "bottleneck_hint": ["unsatisfiable"]}
+        # totally impossible or numerical failure
+        return {"status": "infeasible",
+                "max_feasible_target_per_min": 0.0,
+                "bottleneck_hint": ["unsatisfiable"]}
+
+def build_and_solve(data, maximize_target=False):
+    return solve_model(build_model(data), data, maximize_target)
+
+def solve(data):
+    # Solve one parsed factory problem and return the output object.
+    # Every call builds and solves its own model, so the answer depends only
+    # on data.
+    return build_and_solve(data, maximize_target=False)
+
+class WarmSolver:
+    # Opt-in warm starts for a stream of requests (serve --warm): a request
+    # that differs from the previous one only in target.rate_per_min reuses
+    # the loaded model, and GLOP re-solves from the last basis after the
+    # bound change instead of rebuilding and starting cold. Where several
+    # plans tie on machine count, the plan returned can then depend on the
+    # earlier requests. Each instance owns one solver; do not share it
+    # between threads.
+    def __init__(self):
+        self.key = None
+        self.model = None
+
+    def solve(self, data):
+        key = model_key(data)
+        if key != self.key:
+            self.model = build_model(data)
+            self.key = key
+        return solve_model(self.model, data)
 
 def main():
-    data = read_input()
-    out = build_and_solve(data, maximize_target=False)
-    write_output(out)
+    if "--serve" in sys.argv[1:]:
+        serve(warm="--warm" in sys.argv[1:])
+    else:
+        write_output(solve(read_input()))
 
 if __name__ == "__main__":
     main()
@@ -5,10 +5,11 @@ Generates random but valid (or deliberately infeasible) test inputs for belts/ma
 
 Usage:
   python gen_belts.py > input.json
-  python gen_belts.py 5 > inputs.json
-  python gen_belts.py 3 42 > deterministic_cases.json
+  python gen_belts.py 5 > inputs.ndjson      # 5 cases, one JSON object per line
+  python gen_belts.py 3 42 > deterministic_cases.ndjson
+  python gen_belts.py --pretty               # indented, for reading
 
-Output JSON matches belts/main.py input schema:
+Each case matches the belts/main.py input schema:
 {
   "nodes": [...],
   "edges": [{"from":..,"to":..,"lo":..,"hi":..}, ...],
@@ -22,13 +23,24 @@ import json
 import random
 import sys
 
+try:
+    import orjson  # optional: C serializer
+except ImportError:
+    orjson = None
 
-def make_belt_case(seed: int = None, infeasible: bool = False):
-    if seed is not None:
-        random.seed(seed)
+
+def make_belt_case(seed: int = None, infeasible: bool = False, rng: random.Random = None):
+    # Draw from a private generator (never the module-level one), so cases
+    # can be built from several threads; random.Random(seed) yields the same
+    # sequence random.seed(seed) did.
+    if rng is None:
+        rng = random.Random(seed)
+
+    # bind the draw functions once; each field below is a plain local call
+    randint, rand = rng.randint, rng.random
 
     # ---------------- Nodes ----------------
-    n_internal = random.randint(2, 4)
+    n_internal = randint(2, 4)
     internal_nodes = [chr(ord("a") + i) for i in range(n_internal)]
     nodes = ["s1"] + internal_nodes + ["sink"]
 
@@ -38,44 +50,44 @@ def make_belt_case(seed: int = None, infeasible: bool = False):
 
     # Always start with source → first node
     first_node = internal_nodes[0]
-    lo = random.randint(10, 60)
-    hi = lo + random.randint(50, 200)
+    lo = randint(10, 60)
+    hi = lo + randint(50, 200)
     edges.append({"from": "s1", "to": first_node, "lo": lo, "hi": hi})
 
     # Chain internal nodes (a→b→c→sink)
     for i in range(len(internal_nodes) - 1):
         u = internal_nodes[i]
         v = internal_nodes[i + 1]
-        lo = random.randint(10, 60)
-        hi = lo + random.randint(50, 200)
+        lo = randint(10, 60)
+        hi = lo + randint(50, 200)
         edges.append({"from": u, "to": v, "lo": lo, "hi": hi})
 
     # Final connection to sink
     last_node = internal_nodes[-1]
-    lo = random.randint(0, 30)
-    hi = lo + random.randint(50, 150)
+    lo = randint(0, 30)
+    hi = lo + randint(50, 150)
     if infeasible:
         # Make it infeasible: restrict last edge capacity too low
-        hi = max(10, lo + random.randint(10, 30))
+        hi = max(10, lo + randint(10, 30))
     edges.append({"from": last_node, "to": "sink", "lo": lo, "hi": hi})
 
     # Add a few optional cross-links
-    if random.random() < 0.3 and len(internal_nodes) > 2:
+    if rand() < 0.3 and len(internal_nodes) > 2:
         u = internal_nodes[0]
         v = internal_nodes[-1]
-        lo = random.randint(0, 20)
-        hi = lo + random.randint(20, 100)
+        lo = randint(0, 20)
+        hi = lo + randint(20, 100)
         edges.append({"from": u, "to": v, "lo": lo, "hi": hi})
 
     # ---------------- Sources ----------------
-    total_supply = random.randint(80, 200)
+    total_supply = randint(80, 200)
     sources = {"s1": total_supply}
 
     # ---------------- Node caps ----------------
     node_caps = {}
     for node in internal_nodes:
-        if random.random() < 0.7:  # 70% chance to cap a node
-            node_caps[node] = random.randint(60, 200)
+        if rand() < 0.7:  # 70% chance to cap a node
+            node_caps[node] = randint(60, 200)
 
     # ---------------- Sink ----------------
     sink = "sink"
@@ -90,19 +102,29 @@ def make_belt_case(seed: int = None, infeasible: bool = False):
 
 
 def main():
-    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1
-    seed = int(sys.argv[2]) if len(sys.argv) > 2 else None
-
-    cases = []
+    args = [a for a in sys.argv[1:] if a != "--pretty"]
+    pretty = len(args) < len(sys.argv) - 1
+    n = int(args[0]) if len(args) > 0 else 1
+    seed = int(args[1]) if len(args) > 1 else None
+
+    # Compact JSON by default, with the same separators as the solvers'
+    # output, one case per line (NDJSON when n > 1) so only one case is held
+    # in memory at a time. --pretty indents each case for reading.
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if pretty else 0
+        dumps = lambda case: orjson.dumps(case, option=option)
+    else:
+        dump_kw = {"indent": 2} if pretty else {"separators": (",", ":")}
+        dumps = lambda case: json.dumps(case, **dump_kw).encode("utf-8")
+    out = sys.stdout.buffer
+    # seeded runs rebuild case i from seed + i; unseeded ones share one generator
+    shared = None if seed else random.Random()
     for i in range(n):
         # Alternate between feasible and infeasible for diversity
         infeasible = (i % 2 == 1)
-        cases.append(make_belt_case(seed + i if seed else None, infeasible))
-
-    if n == 1:
-        print(json.dumps(cases[0], indent=2))
-    else:
-        print(json.dumps(cases, indent=2))
+        rng = random.Random(seed + i) if seed else shared
+        out.write(dumps(make_belt_case(infeasible=infeasible, rng=rng)))
+        out.write(b"\n")
 
 
 if __name__ == "__main__":
@@ -5,32 +5,44 @@ Generates *random but valid* factory problem instances for testing factory/main.
 
 Usage:
   python gen_factory.py > input.json
-  python gen_factory.py 5 > cases.json
-  python gen_factory.py 1 42 > input.json   # 1 case, deterministic with seed 42
+  python gen_factory.py 5 > cases.ndjson     # 5 cases, one JSON object per line
+  python gen_factory.py 1 42 > input.json    # 1 case, deterministic with seed 42
+  python gen_factory.py --pretty             # indented, for reading
 """
 
 import json
 import random
 import sys
 
+try:
+    import orjson  # optional: C serializer
+except ImportError:
+    orjson = None
 
-def make_factory_case(seed: int = None):
-    if seed is not None:
-        random.seed(seed)
+
+def make_factory_case(seed: int = None, rng: random.Random = None):
+    # Draw from a private generator (never the module-level one), so cases
+    # can be built from several threads; random.Random(seed) yields the same
+    # sequence random.seed(seed) did.
+    if rng is None:
+        rng = random.Random(seed)
+
+    # bind the draw functions once; each field below is a plain local call
+    uniform, randint, rand, choice = rng.uniform, rng.randint, rng.random, rng.choice
 
     # --- Machines ---
     machine_types = ["assembler_1", "assembler_2", "chemical", "furnace"]
     machines = {}
     for m in machine_types:
-        machines[m] = {"crafts_per_min": round(random.uniform(10, 120), 3)}
+        machines[m] = {"crafts_per_min": round(uniform(10, 120), 3)}
 
     # --- Modules ---
     modules = {}
     for m in machine_types:
-        if random.random() < 0.6:  # 60% chance to have modules
+        if rand() < 0.6:  # 60% chance to have modules
             modules[m] = {
-                "prod": round(random.uniform(0.0, 0.25), 3),
-                "speed": round(random.uniform(0.0, 0.25), 3),
+                "prod": round(uniform(0.0, 0.25), 3),
+                "speed": round(uniform(0.0, 0.25), 3),
             }
         else:
             modules[m] = {"prod": 0.0, "speed": 0.0}
@@ -38,7 +50,7 @@ def make_factory_case(seed: int = None):
     # --- Base resources ---
     raw_items = ["iron_ore", "copper_ore", "coal", "petroleum_gas", "water"]
     raw_supply = {
-        r: round(random.uniform(5000, 500000), 2) for r in raw_items
+        r: round(uniform(5000, 500000), 2) for r in raw_items
     }
 
     # --- Recipes chain selection ---
@@ -59,9 +71,9 @@ def make_factory_case(seed: int = None):
     }
 
     # Optional early branching
-    if random.random() < 0.8:
+    if rand() < 0.8:
         recipes["copper_cable"] = {
-            "machine": random.choice(["assembler_1", "assembler_2"]),
+            "machine": choice(["assembler_1", "assembler_2"]),
             "time_s": 0.5,
             "in": {"copper_plate": 1},
             "out": {"copper_cable": 2},
@@ -69,14 +81,14 @@ def make_factory_case(seed: int = None):
 
     # Green circuits
     recipes["green_circuit"] = {
-        "machine": random.choice(["assembler_1", "assembler_2"]),
+        "machine": choice(["assembler_1", "assembler_2"]),
         "time_s": 0.5,
         "in": {"iron_plate": 1, "copper_cable": 3},
         "out": {"green_circuit": 1},
     }
 
     # Optionally red circuits chain
-    if random.random() < 0.5:
+    if rand() < 0.5:
         recipes["plastic_bar"] = {
             "machine": "chemical",
             "time_s": 1.0,
@@ -84,7 +96,7 @@ def make_factory_case(seed: int = None):
             "out": {"plastic_bar": 2},
         }
         recipes["red_circuit"] = {
-            "machine": random.choice(["assembler_1", "assembler_2"]),
+            "machine": choice(["assembler_1", "assembler_2"]),
             "time_s": 6.0,
             "in": {
                 "green_circuit": 2,
@@ -95,7 +107,7 @@ def make_factory_case(seed: int = None):
         }
 
     # Optionally add a battery chain
-    if random.random() < 0.4:
+    if rand() < 0.4:
         recipes["sulfur"] = {
             "machine": "chemical",
             "time_s": 1.0,
@@ -121,13 +133,13 @@ def make_factory_case(seed: int = None):
 
     # --- Limits ---
     max_machines = {
-        m: random.randint(50, 500) for m in machine_types
+        m: randint(50, 500) for m in machine_types
     }
 
     # --- Target selection ---
     all_outputs = [list(r["out"].keys())[0] for r in recipes.values()]
-    target_item = random.choice(all_outputs)
-    target_rate = random.choice([120, 300, 600, 900, 1800])
+    target_item = choice(all_outputs)
+    target_rate = choice([120, 300, 600, 900, 1800])
 
     # --- Final payload ---
     data = {
@@ -144,14 +156,27 @@ def make_factory_case(seed: int = None):
 
 
 def main():
-    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1
-    seed = int(sys.argv[2]) if len(sys.argv) > 2 else None
-    cases = [make_factory_case(seed + i if seed else None) for i in range(n)]
-
-    if n == 1:
-        print(json.dumps(cases[0], indent=2))
+    args = [a for a in sys.argv[1:] if a != "--pretty"]
+    pretty = len(args) < len(sys.argv) - 1
+    n = int(args[0]) if len(args) > 0 else 1
+    seed = int(args[1]) if len(args) > 1 else None
+
+    # Compact JSON by default, with the same separators as the solvers'
+    # output, one case per line (NDJSON when n > 1) so only one case is held
+    # in memory at a time. --pretty indents each case for reading.
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if pretty else 0
+        dumps = lambda case: orjson.dumps(case, option=option)
     else:
-        print(json.dumps(cases, indent=2))
+        dump_kw = {"indent": 2} if pretty else {"separators": (",", ":")}
+        dumps = lambda case: json.dumps(case, **dump_kw).encode("utf-8")
+    out = sys.stdout.buffer
+    # seeded runs rebuild case i from seed + i; unseeded ones share one generator
+    shared = None if seed else random.Random()
+    for i in range(n):
+        rng = random.Random(seed + i) if seed else shared
+        out.write(dumps(make_factory_case(rng=rng)))
+        out.write(b"\n")
 
 
 if __name__ == "__main__":
@@ -1,28 +1,34 @@
 # run_samples.py
 import json
+import os
 import sys
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Tuple, List
 
+# the solvers' JSON codec: orjson when installed, stdlib json otherwise
+# (belts.main needs only the stdlib)
+from belts.main import dumps, loads
+
 TOL = 0.11
 
-def run(cmd: str, payload: Dict[str, Any]) -> Tuple[Dict[str, Any], str, str]:
+def run(argv: List[str], payload: Dict[str, Any]) -> Dict[str, Any]:
+    # argv is split once by the caller; payload and output stay bytes end
+    # to end, and are only decoded to text when reporting a failure.
     p = subprocess.run(
-        cmd.split(),
-        input=json.dumps(payload).encode("utf-8"),
+        argv,
+        input=dumps(payload),
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
         check=False,
     )
-    out = p.stdout.decode("utf-8").strip()
-    err = p.stderr.decode("utf-8")
     try:
-        return json.loads(out), out, err
+        return loads(p.stdout)
     except Exception:
         print("STDOUT:")
-        print(out)
+        print(p.stdout.decode("utf-8", "replace").strip())
         print("STDERR:")
-        print(err)
+        print(p.stderr.decode("utf-8", "replace"))
         raise
 
 # ---------------- Factory samples ----------------
@@ -189,36 +195,61 @@ BELTS_SAMPLES: List[Dict[str, Any]] = [
     }
 ]
 
+def run_sample(solve, case: Dict[str, Any]) -> Tuple[Any, Any]:
+    # (output, None) on success, (None, exception) if the sample failed
+    try:
+        return solve(case["payload"]), None
+    except Exception as e:
+        return None, e
+
 def pretty_print(name: str, obj: Dict[str, Any]):
     print("##", name)
     print(json.dumps(obj, indent=2, ensure_ascii=False, separators=(",", ":")))
     print()
 
 def main():
-    if len(sys.argv) < 3:
-        print('Usage: python run_samples.py "python factory/main.py" "python belts/main.py"')
+    # Default: call both solvers in-process. --subprocess (or passing the
+    # two commands) runs every sample through the CLIs instead.
+    args = sys.argv[1:]
+    use_subprocess = "--subprocess" in args
+    args = [a for a in args if a != "--subprocess"]
+    if len(args) not in (0, 2):
+        print('Usage: python run_samples.py [--subprocess] ["python factory/main.py" "python belts/main.py"]')
         sys.exit(2)
+    if args:
+        use_subprocess = True
+        factory_cmd, belts_cmd = args
+    else:
+        factory_cmd, belts_cmd = "python factory/main.py", "python belts/main.py"
 
-    factory_cmd = sys.argv[1]
-    belts_cmd = sys.argv[2]
+    if use_subprocess:
+        factory_argv = factory_cmd.split()
+        belts_argv = belts_cmd.split()
+        factory_run = lambda payload: run(factory_argv, payload)
+        belts_run = lambda payload: run(belts_argv, payload)
+    else:
+        from factory.main import build_and_solve as factory_run
+        from belts.main import solve as belts_run
 
-    print("# Running factory samples\n")
-    for case in FACTORY_SAMPLES:
-        try:
-            got, raw_out, raw_err = run(factory_cmd, case["payload"])
-        except Exception as e:
-            print(f"## {case['name']} - error running sample")
-            print(str(e))
-            continue
-        pretty_print(case["name"], got)
+    # Each subprocess sample is independent and waits on its own child, so
+    # they all run at once on a thread pool; in-process solves stay
+    # sequential (they hold the GIL). Results print in sample order.
+    jobs = [(factory_run, case) for case in FACTORY_SAMPLES] + \
+           [(belts_run, case) for case in BELTS_SAMPLES]
+    if use_subprocess:
+        with ThreadPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1)) as ex:
+            results = list(ex.map(lambda job: run_sample(*job), jobs))
+    else:
+        results = [run_sample(*job) for job in jobs]
 
-    print("# Running belts samples\n")
-    for case in BELTS_SAMPLES:
-        try:
-            got, raw_out, raw_err = run(belts_cmd, case["payload"])
-        except Exception as e:
+    for i, (case, (got, error)) in enumerate(zip((c for _, c in jobs), results)):
+        if i == 0:
+            print("# Running factory samples\n")
+        elif i == len(FACTORY_SAMPLES):
+            print("# Running belts samples\n")
+        if error is not None:
             print(f"## {case['name']} - error running sample")
-            print(str(e))
+            print(str(error))
             continue
         pretty_print(case["name"], got)
 
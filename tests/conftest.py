@@ -0,0 +1,18 @@
+# tests/conftest.py
+import pytest
+
+from helpers import BELTS_ARGV, FACTORY_ARGV, Worker
+
+
+@pytest.fixture(scope="session")
+def belts_worker():
+    worker = Worker(BELTS_ARGV)
+    yield worker
+    worker.close()
+
+
+@pytest.fixture(scope="session")
+def factory_worker():
+    worker = Worker(FACTORY_ARGV)
+    yield worker
+    worker.close()
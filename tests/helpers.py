@@ -0,0 +1,59 @@
+# tests/helpers.py
+# Shared by the test modules and conftest.py's fixtures; a plain module
+# (imported as `helpers`, like the test modules themselves), so nothing
+# imports conftest directly.
+import copy
+import functools
+import subprocess
+import sys
+from pathlib import Path
+
+# same codec as the CLIs: orjson bytes when installed, stdlib json otherwise
+from belts.main import dumps, loads
+
+# argv built once: the interpreter running pytest (no PATH lookup) and
+# absolute script paths, so the suite runs from any directory
+ROOT = Path(__file__).parent.parent
+BELTS_ARGV = [sys.executable, str(ROOT / "belts" / "main.py")]
+FACTORY_ARGV = [sys.executable, str(ROOT / "factory" / "main.py")]
+
+
+def memoized_solver(solve):
+    # run_case for a test module: the solver called in-process, with each
+    # result memoized on the payload for the session. Both solve()
+    # functions depend only on their input, so a payload repeated across
+    # tests or parametrizations is solved once. The key is the payload
+    # serialized as given (dict and edge order kept, since recipe order
+    # fixes the LP column order); callers get a deep copy, so a test that
+    # edits its result cannot leak into later ones.
+    @functools.lru_cache(maxsize=256)
+    def solve_cached(payload_key):
+        return solve(loads(payload_key))
+
+    def run_case(payload):
+        return copy.deepcopy(solve_cached(dumps(payload)))
+
+    return run_case
+
+
+class Worker:
+    """One long-lived `<argv> --serve` process: a JSON line in, a JSON line out."""
+
+    def __init__(self, argv):
+        self.proc = subprocess.Popen(
+            argv + ["--serve"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+
+    def run(self, payload):
+        self.proc.stdin.write(dumps(payload) + b"\n")
+        self.proc.stdin.flush()
+        line = self.proc.stdout.readline()
+        if not line:
+            raise RuntimeError(f"worker exited with code {self.proc.wait()}")
+        return loads(line)
+
+    def close(self):
+        self.proc.stdin.close()
+        self.proc.wait()
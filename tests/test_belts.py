@@ -1,28 +1,12 @@
 # tests/test_belts.py
-import json
-import subprocess
-import sys
-from pathlib import Path
-
-BELTS_CMD = "python belts/main.py"
-
-def run_case(payload):
-    p = subprocess.run(
-        BELTS_CMD.split(),
-        input=json.dumps(payload).encode("utf-8"),
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        check=False,
-    )
-    out = p.stdout.decode("utf-8").strip()
-    err = p.stderr.decode("utf-8")
-    if out == "":
-        # help debug if the script printed to stderr or crashed
-        raise RuntimeError(f"No stdout from belts command. Stderr:\n{err}")
-    try:
-        return json.loads(out)
-    except Exception as e:
-        raise RuntimeError(f"Failed to parse JSON output. stdout:\n{out}\nstderr:\n{err}") from e
+import copy
+
+import pytest
+
+from belts.main import Dinic, DinicInt, solve as belts_solve
+from helpers import memoized_solver
+
+run_case = memoized_solver(belts_solve)
 
 def test_belts_feasible_lower_bounds_node_cap():
     payload = {
@@ -37,9 +21,12 @@ def test_belts_feasible_lower_bounds_node_cap():
         # belts/main.py expects node_caps as simple numeric mapping (throughput value).
         "node_caps": {"b": 120}
     }
-    out = run_case(payload)
+    before = copy.deepcopy(payload)
+    out = belts_solve(payload)
     assert "status" in out
     assert out["status"] == "ok", f"Expected feasible case to be ok, got: {out}"
+    # solve() works on the caller's dict and must not mutate it
+    assert payload == before
 
 def test_belts_infeasible_cut():
     payload = {
@@ -56,3 +43,246 @@ def test_belts_infeasible_cut():
     out = run_case(payload)
     assert "status" in out
     assert out["status"] == "infeasible", f"Expected infeasible case, got: {out}"
+    # min cut: b -> sink (hi 60) separates the 120/min supply from the sink
+    assert out["cut_reachable"] == ["a", "b", "s1"]
+    assert out["deficit"]["demand_balance"] == 60
+
+def test_belts_long_chain():
+    # node splitting doubles the path length; recursive DFS used to overflow here
+    n = 3000
+    nodes = ["s1"] + [f"c{i}" for i in range(n)] + ["sink"]
+    payload = {
+        "nodes": nodes,
+        "edges": [{"from": nodes[i], "to": nodes[i + 1], "lo": 0, "hi": 10} for i in range(n + 1)],
+        "sources": {"s1": 5},
+        "sink": "sink",
+        "node_caps": {name: 7 for name in nodes[1:-1]}
+    }
+    out = run_case(payload)
+    assert out["status"] == "ok", f"Expected feasible case to be ok, got: {out}"
+    assert abs(out["max_flow_per_min"] - 5) < 1e-9
+
+def build_graph(cls, n, edges):
+    g = cls(n)
+    refs = [g.add_edge(u, v, c) for u, v, c in edges]
+    return g, refs
+
+def edge_flows(g, refs):
+    return [g.cap[ref ^ 1] for ref in refs]
+
+def check_flow(n, edges, s, t, flow):
+    # conservation at every inner node and capacity on every edge
+    net = [0] * n
+    for (u, v, c), f in zip(edges, flow):
+        assert -1e-9 <= f <= c + 1e-9
+        net[u] -= f
+        net[v] += f
+    assert all(abs(net[v]) < 1e-9 for v in range(n) if v not in (s, t))
+
+# 0 = s, 1 = t; s feeds most nodes directly (the push-relabel regime)
+WIDE_EDGES = [
+    (0, 2, 7), (0, 3, 4), (0, 4, 9), (0, 5, 3), (0, 6, 5),
+    (2, 3, 2), (2, 1, 4), (3, 1, 5), (4, 5, 6), (4, 1, 2),
+    (5, 1, 6), (6, 7, 5), (7, 1, 3), (6, 2, 1),
+]
+# excess stuck at 2 and 4 cannot reach t and must drain back to s
+DRAIN_EDGES = [(0, 2, 10), (0, 3, 5), (2, 1, 3), (3, 1, 5), (2, 4, 4), (4, 5, 1)]
+
+@pytest.mark.parametrize("cls", [Dinic, DinicInt])
+@pytest.mark.parametrize("edges, expected", [(WIDE_EDGES, 20), (DRAIN_EDGES, 8)])
+def test_push_relabel_matches_max_flow(cls, edges, expected):
+    scale = 0.5 if cls is Dinic else 1  # float residuals on Dinic
+    edges = [(u, v, c * scale) for u, v, c in edges]
+    n = 1 + max(max(u, v) for u, v, _ in edges)
+    results = []
+    for run in ("max_flow", "push_relabel"):
+        g, refs = build_graph(cls, n, edges)
+        value = getattr(g, run)(0, 1)
+        flow = edge_flows(g, refs)
+        check_flow(n, edges, 0, 1, flow)
+        results.append((value, g.reachable(0)))
+    (mf_value, mf_cut), (pr_value, pr_cut) = results
+    assert abs(mf_value - expected * scale) < 1e-9
+    assert abs(pr_value - mf_value) < 1e-9
+    assert pr_cut == mf_cut
+
+# infeasible; the push-relabel flow saturates a different split edge than
+# Dinic's, which used to change tight_nodes
+PUSH_RELABEL_INFEASIBLE = {
+    "nodes": ["v0", "v1", "v2", "v3", "sink"],
+    "edges": [
+        {"from": "v0", "to": "v1", "lo": 6, "hi": 18},
+        {"from": "v0", "to": "sink", "lo": 0, "hi": 12},
+        {"from": "v1", "to": "v2", "lo": 5, "hi": 11},
+        {"from": "v2", "to": "v3", "lo": 3, "hi": 13},
+        {"from": "v3", "to": "sink", "lo": 0, "hi": 3},
+        {"from": "v3", "to": "sink", "lo": 0, "hi": 7}
+    ],
+    "sources": {"v1": 9, "v3": 5, "v0": 5},
+    "sink": "sink",
+    "node_caps": {"v1": 4, "v2": 4}
+}
+
+def test_push_relabel_infeasible_certificate_matches_dinic(monkeypatch):
+    import belts.main
+    # every instance on push-relabel, then every instance on Dinic
+    monkeypatch.setattr(belts.main, "PUSH_RELABEL_MIN_TERMINAL_SHARE", 0.0)
+    monkeypatch.setattr(belts.main, "PUSH_RELABEL_MAX_DEGREE", float("inf"))
+    via_push_relabel = belts_solve(PUSH_RELABEL_INFEASIBLE)
+    monkeypatch.setattr(belts.main, "PUSH_RELABEL_MIN_TERMINAL_SHARE", float("inf"))
+    via_dinic = belts_solve(PUSH_RELABEL_INFEASIBLE)
+    assert via_dinic["status"] == "infeasible"
+    assert via_push_relabel == via_dinic
+
+def fractional_payload(supply):
+    # non-integer bounds and supply: solved on the float Dinic, not DinicInt
+    return {
+        "nodes": ["s1", "a", "b", "c", "sink"],
+        "edges": [
+            {"from": "s1", "to": "a", "lo": 0.5, "hi": 20.5},
+            {"from": "a", "to": "b", "lo": 0, "hi": 15.75},
+            {"from": "a", "to": "c", "lo": 0, "hi": 2.25},
+            {"from": "b", "to": "c", "lo": 0, "hi": 15.75},
+            {"from": "c", "to": "sink", "lo": 0, "hi": 20.5}
+        ],
+        "sources": {"s1": supply},
+        "sink": "sink",
+        "node_caps": {"b": 10.5}
+    }
+
+def test_belts_fractional_feasible():
+    out = run_case(fractional_payload(12.5))
+    assert out["status"] == "ok", f"Expected feasible case to be ok, got: {out}"
+    assert abs(out["max_flow_per_min"] - 12.5) < 1e-9
+    flows = {(f["from"], f["to"]): f["flow"] for f in out["flows"]}
+    assert flows[("a", "b")] <= 10.5 + 1e-9
+    assert abs(flows[("a", "b")] + flows[("a", "c")] - 12.5) < 1e-9
+
+def test_belts_fractional_infeasible():
+    # node cap b (10.5) plus a -> c (2.25) carry 12.75 of the 13.5 supplied
+    out = run_case(fractional_payload(13.5))
+    assert out["status"] == "infeasible", f"Expected infeasible case, got: {out}"
+    assert out["cut_reachable"] == ["a", "b", "s1"]
+    assert abs(out["deficit"]["demand_balance"] - 0.75) < 1e-9
+    assert out["deficit"]["tight_nodes"] == ["b"]
+
+def test_run_case_returns_private_copies():
+    payload = fractional_payload(12.5)
+    out = run_case(payload)
+    out["flows"].clear()
+    assert run_case(payload)["flows"], "memoized result was shared with the caller"
+
+def test_belts_isolated_source():
+    payload = {
+        "nodes": ["s1", "s2", "a", "sink"],
+        "edges": [
+            {"from": "s1", "to": "a", "lo": 0, "hi": 100},
+            {"from": "a", "to": "sink", "lo": 0, "hi": 100}
+        ],
+        "sources": {"s2": 5},
+        "sink": "sink",
+        "node_caps": {}
+    }
+    out = run_case(payload)
+    assert out["status"] == "infeasible", f"Expected infeasible case, got: {out}"
+    assert out["cut_reachable"] == ["s2"]
+    assert out["deficit"]["demand_balance"] == 5
+
+def test_belts_isolated_source_with_other_shortfall():
+    # s1 is short too, so the cut is wider than {s2} alone
+    payload = {
+        "nodes": ["s1", "s2", "a", "sink"],
+        "edges": [
+            {"from": "s1", "to": "a", "lo": 0, "hi": 3},
+            {"from": "a", "to": "sink", "lo": 0, "hi": 100}
+        ],
+        "sources": {"s1": 10, "s2": 5},
+        "sink": "sink",
+        "node_caps": {}
+    }
+    out = run_case(payload)
+    assert out["status"] == "infeasible", f"Expected infeasible case, got: {out}"
+    assert out["cut_reachable"] == ["s1", "s2"]
+    assert out["deficit"]["demand_balance"] == 12
+    assert out["deficit"]["tight_edges"] == [{"from": "s1", "to": "a", "flow_needed": 0.0}]
+
+def test_belts_cancelling_supplies_infeasible():
+    # +5 at a and -5 at b sum to zero but still force 5 units out of a
+    payload = {
+        "nodes": ["a", "b", "sink"],
+        "edges": [{"from": "a", "to": "sink", "lo": 0, "hi": 3}],
+        "sources": {"a": 5, "b": -5},
+        "sink": "sink",
+        "node_caps": {}
+    }
+    out = run_case(payload)
+    assert out["status"] == "infeasible", f"Expected infeasible case, got: {out}"
+    assert out["cut_reachable"] == ["a", "sink"]
+    assert out["deficit"]["demand_balance"] == 5
+
+def test_belts_cancelling_supplies_routed():
+    payload = {
+        "nodes": ["a", "b", "sink"],
+        "edges": [{"from": "a", "to": "b", "lo": 0, "hi": 10}],
+        "sources": {"a": 5, "b": -5},
+        "sink": "sink",
+        "node_caps": {}
+    }
+    out = run_case(payload)
+    assert out["status"] == "ok", f"Expected feasible case to be ok, got: {out}"
+    assert out["flows"] == [{"from": "a", "to": "b", "flow": 5.0}]
+
+def test_belts_source_not_in_nodes():
+    # a supplied name missing from `nodes` is not part of the graph
+    payload = {
+        "nodes": ["s1", "a", "sink"],
+        "edges": [
+            {"from": "s1", "to": "a", "lo": 0, "hi": 30},
+            {"from": "a", "to": "sink", "lo": 0, "hi": 100}
+        ],
+        "sources": {"x": 4},
+        "sink": "sink",
+        "node_caps": {}
+    }
+    out = run_case(payload)
+    assert out["status"] == "ok", f"Expected feasible case to be ok, got: {out}"
+
+def test_belts_cli_smoke(belts_worker):
+    # end-to-end through the command-line tool; one --serve process
+    # answers every payload
+    payloads = [
+        {
+            "nodes": ["s1", "a", "sink"],
+            "edges": [
+                {"from": "s1", "to": "a", "lo": 0, "hi": 50},
+                {"from": "a", "to": "sink", "lo": 0, "hi": 50}
+            ],
+            "sources": {"s1": 30},
+            "sink": "sink",
+            "node_caps": {}
+        },
+        {
+            "nodes": ["s1", "a", "sink"],
+            "edges": [
+                {"from": "s1", "to": "a", "lo": 0, "hi": 50},
+                {"from": "a", "to": "sink", "lo": 0, "hi": 20}
+            ],
+            "sources": {"s1": 30},
+            "sink": "sink",
+            "node_caps": {}
+        }
+    ]
+    outs = [belts_worker.run(payload) for payload in payloads]
+    assert outs == [run_case(payload) for payload in payloads]
+    assert outs[0]["status"] == "ok"
+    assert abs(outs[0]["max_flow_per_min"] - 30) < 1e-9
+    assert outs[1]["status"] == "infeasible"
+
+def test_belts_cli_big_integer(belts_worker):
+    # demand_balance is printed as an int; 10**20 is past orjson's 64-bit
+    # limit and must still come out through --serve
+    payload = {"nodes": ["a", "sink"], "edges": [], "sources": {"a": 1e20}, "sink": "sink", "node_caps": {}}
+    out = belts_worker.run(payload)
+    assert out["status"] == "infeasible"
+    assert out["deficit"]["demand_balance"] == 10**20
+    assert out == run_case(payload)
@@ -1,26 +1,167 @@
-import subprocess, json, sys, os, tempfile
+import subprocess, copy
 
-FACTORY_CMD = "python factory/main.py"
+import pytest
 
-def run_case(json_obj):
-    p = subprocess.Popen(FACTORY_CMD.split(), stdin=subprocess.PIPE, stdout=subprocess.PIPE)
-    out, _ = p.communicate(json.dumps(json_obj).encode())
-    return json.loads(out)
+from helpers import FACTORY_ARGV, memoized_solver
+from factory.main import WarmSolver, dumps, loads, solve as factory_solve
+
+# shared by the green-circuit cases; each derives its own input with
+# {**FACTORY_BASE_INPUT, "target": ...} instead of rebuilding the dict
+FACTORY_BASE_INPUT = {
+  "machines": {
+    "assembler_1": {"crafts_per_min": 30},
+    "chemical": {"crafts_per_min": 60}
+  },
+  "recipes": {
+    "iron_plate": {"machine": "chemical", "time_s": 3.2, "in": {"iron_ore":1}, "out": {"iron_plate":1}},
+    "copper_plate": {"machine": "chemical", "time_s": 3.2, "in": {"copper_ore":1}, "out":{"copper_plate":1}},
+    "green_circuit": {"machine":"assembler_1", "time_s": 0.5, "in":{"iron_plate":1,"copper_plate":3}, "out":{"green_circuit":1}}
+  },
+  "modules": {},
+  "limits": {"raw_supply_per_min": {"iron_ore":5000,"copper_ore":5000}, "max_machines":{"assembler_1":300,"chemical":300}},
+  "target": {"item":"green_circuit","rate_per_min":1800}
+}
+
+run_case = memoized_solver(factory_solve)
+
+def run_cli(json_obj):
+    p = subprocess.run(FACTORY_ARGV, input=dumps(json_obj), capture_output=True)
+    if p.returncode != 0:
+        # surface the solver's traceback instead of a JSON decode error
+        raise RuntimeError(f"factory command failed ({p.returncode}). Stderr:\n{p.stderr.decode('utf-8')}")
+    return loads(p.stdout)
 
 def test_simple_green():
+    before = copy.deepcopy(FACTORY_BASE_INPUT)
+    out = factory_solve(FACTORY_BASE_INPUT)
+    assert out["status"] in ("ok","infeasible")
+    # solve() works on the caller's dict and must not mutate it
+    assert FACTORY_BASE_INPUT == before
+
+@pytest.mark.parametrize("target_rate", [600, 1800, 3600, 7200])
+def test_green_target_rates(target_rate):
+    out = run_case({**FACTORY_BASE_INPUT, "target": {"item": "green_circuit", "rate_per_min": target_rate}})
+    # 3 copper plates per circuit against 5000 copper ore/min caps the rate
+    max_rate = 5000 / 3
+    if target_rate <= max_rate:
+        assert out["status"] == "ok"
+        assert abs(out["per_recipe_crafts_per_min"]["green_circuit"] - target_rate) < 1e-6
+    else:
+        assert out["status"] == "infeasible"
+        assert abs(out["max_feasible_target_per_min"] - max_rate) < 1e-6
+        assert "copper_ore supply" in out["bottleneck_hint"]
+
+def test_warm_solver_restores_objective():
+    # same model at another rate is solved from WarmSolver's loaded model;
+    # after an infeasible phase 2 the machine objective must be back in
+    # place, or the slow recipe it used at the max rate would stay in the plan
+    base = {
+      "machines": {"assembler_1": {"crafts_per_min": 60}, "assembler_0": {"crafts_per_min": 6}},
+      "recipes": {
+        "gear": {"machine": "assembler_1", "time_s": 1, "in": {"iron_plate": 2}, "out": {"gear": 1}},
+        "gear_slow": {"machine": "assembler_0", "time_s": 1, "in": {"iron_plate": 1}, "out": {"gear": 1}}
+      },
+      "modules": {},
+      "limits": {"raw_supply_per_min": {"iron_plate": 1000}, "max_machines": {"assembler_1": 10, "assembler_0": 10}},
+    }
+    low = {**base, "target": {"item": "gear", "rate_per_min": 120}}
+    high = {**base, "target": {"item": "gear", "rate_per_min": 900}}
+    warm = WarmSolver()
+    first = warm.solve(low)
+    assert first == factory_solve(low)
+    assert first["per_machine_counts"] == {"assembler_1": 2, "assembler_0": 0}
+    assert warm.solve(high)["status"] == "infeasible"
+    assert warm.solve(low) == first
+
+# four recipes tied on machine cost (same crafts_per_min): several plans
+# use the minimum of 2 machines at 39/min
+TIED_INPUT = {
+  "machines": {f"m{i}": {"crafts_per_min": 30} for i in range(4)},
+  "recipes": {f"r{i}": {"machine": f"m{i}", "time_s": 1, "in": {"ore": ore}, "out": {"g": 1}}
+              for i, ore in enumerate((3, 2, 2, 3))},
+  "modules": {},
+  "limits": {"raw_supply_per_min": {"ore": 951}, "max_machines": {"m0": 17, "m1": 18, "m2": 13, "m3": 23}},
+}
+
+def test_tied_optima_independent_of_history():
+    # solve() builds a fresh model per call, so an earlier request on the
+    # same model (here an infeasible rate) cannot change which tied plan
+    # comes back
+    low = {**TIED_INPUT, "target": {"item": "g", "rate_per_min": 39}}
+    high = {**TIED_INPUT, "target": {"item": "g", "rate_per_min": 804}}
+    first = factory_solve(low)
+    assert factory_solve(high)["status"] == "infeasible"
+    assert factory_solve(low) == first
+    # a fresh process has no history at all
+    assert run_cli(low) == first
+    # whichever tied plan GLOP picks, it meets the rate at the optimal
+    # machine objective: every recipe makes 1 g per craft at 30 crafts/min
+    assert first["status"] == "ok"
+    per_recipe = first["per_recipe_crafts_per_min"]
+    assert abs(sum(x / 30 for x in per_recipe.values()) - 39 / 30) < 1e-9
+
+def test_warm_solver_tied_optima():
+    # WarmSolver may settle a tie differently after other rates, but the
+    # plan is still optimal: the same machine objective as a cold solve
+    low = {**TIED_INPUT, "target": {"item": "g", "rate_per_min": 39}}
+    warm = WarmSolver()
+    warm.solve({**TIED_INPUT, "target": {"item": "g", "rate_per_min": 804}})
+    out = warm.solve(low)
+    cold = factory_solve(low)
+    assert out["status"] == "ok"
+    machines = lambda plan: sum(x / 30 for x in plan["per_recipe_crafts_per_min"].values())
+    assert abs(machines(out) - machines(cold)) < 1e-9
+    assert abs(machines(out) - 39 / 30) < 1e-9
+
+def test_model_load_error_raises(monkeypatch):
+    # a column past the last variable must surface GLOP's load error, not a
+    # later IndexError
+    import factory.main
+    monkeypatch.setattr(factory.main, "balance_rows", lambda recipes, prod: {"gear": ([99], [1.0])})
+    with pytest.raises(RuntimeError, match="out of bounds"):
+        factory_solve(FACTORY_BASE_INPUT)
+
+def test_cli_smoke():
+    # one end-to-end run through the command-line tool (stdin -> stdout)
     input_data = {
-      "machines": {
-        "assembler_1": {"crafts_per_min": 30},
-        "chemical": {"crafts_per_min": 60}
+      "machines": {"assembler_1": {"crafts_per_min": 60}},
+      "recipes": {
+        "gear": {"machine": "assembler_1", "time_s": 1, "in": {"iron_plate": 2}, "out": {"gear": 1}}
       },
+      "modules": {},
+      "limits": {"raw_supply_per_min": {"iron_plate": 1000}, "max_machines": {"assembler_1": 10}},
+      "target": {"item": "gear", "rate_per_min": 120}
+    }
+    out = run_cli(input_data)
+    assert out == run_case(input_data)
+    assert out["status"] == "ok"
+    assert out["per_machine_counts"] == {"assembler_1": 2}
+
+def test_cli_serve(factory_worker):
+    # several payloads through one --serve process
+    base = {
+      "machines": {"assembler_1": {"crafts_per_min": 60}},
       "recipes": {
-        "iron_plate": {"machine": "chemical", "time_s": 3.2, "in": {"iron_ore":1}, "out": {"iron_plate":1}},
-        "copper_plate": {"machine": "chemical", "time_s": 3.2, "in": {"copper_ore":1}, "out":{"copper_plate":1}},
-        "green_circuit": {"machine":"assembler_1", "time_s": 0.5, "in":{"iron_plate":1,"copper_plate":3}, "out":{"green_circuit":1}}
+        "gear": {"machine": "assembler_1", "time_s": 1, "in": {"iron_plate": 2}, "out": {"gear": 1}}
       },
       "modules": {},
-      "limits": {"raw_supply_per_min": {"iron_ore":5000,"copper_ore":5000}, "max_machines":{"assembler_1":300,"chemical":300}},
-      "target": {"item":"green_circuit","rate_per_min":1800}
+      "limits": {"raw_supply_per_min": {"iron_plate": 1000}, "max_machines": {"assembler_1": 10}},
     }
-    out = run_case(input_data)
-    assert out["status"] in ("ok","infeasible")
+    for rate in (60, 120, 900):
+        payload = {**base, "target": {"item": "gear", "rate_per_min": rate}}
+        assert factory_worker.run(payload) == run_case(payload)
+
+def test_cli_serve_big_integer(factory_worker):
+    # math.ceil of the machine count gives an int past orjson's 64-bit
+    # limit; --serve must still answer
+    payload = {
+      "machines": {"a": {"crafts_per_min": 60}},
+      "recipes": {"g": {"machine": "a", "time_s": 1, "in": {"ore": 1}, "out": {"g": 1}}},
+      "modules": {},
+      "limits": {"raw_supply_per_min": {"ore": 1e30}, "max_machines": {}},
+      "target": {"item": "g", "rate_per_min": 1e22}
+    }
+    out = factory_worker.run(payload)
+    assert out["status"] == "ok"
+    assert out["per_machine_counts"]["a"] == run_case(payload)["per_machine_counts"]["a"]
+    assert run_case(payload)["per_machine_counts"]["a"] > 2**64